@@ -0,0 +1,81 @@
+import os
+from fnmatch import fnmatch
+
+import numpy as np
+import orjson
+import pandas as pd
+
+# Data locations
+streaming_pre = './streaming_history_files'
+parquet_cache = streaming_pre + '/_cache.parquet'
+
+# The only fields the dashboard uses; everything else in the exports is never materialized
+NEEDED_COLS = ['platform', 'ms_played', 'master_metadata_track_name',
+               'master_metadata_album_artist_name', 'master_metadata_album_album_name',
+               'spotify_track_uri', 'reason_start', 'reason_end', 'skipped', 'ts']
+
+try:
+    import polars as pl
+    _HAS_POLARS = True
+except ImportError:
+    _HAS_POLARS = False
+
+def _find_streaming_files(pattern):
+    """Single directory scan returning sorted (name, mtime) pairs for matching exports"""
+    with os.scandir(streaming_pre) as it:
+        files = [(e.name, e.stat().st_mtime) for e in it
+                 if e.is_file() and fnmatch(e.name, pattern)]
+    files.sort()
+    return files
+
+def _ensure_parquet_cache(files):
+    """Rebuild the Parquet cache if any source JSON file is newer, return its mtime"""
+    newest_json = max((mtime for _, mtime in files), default=0)
+    if not os.path.exists(parquet_cache) or os.path.getmtime(parquet_cache) < newest_json:
+        if _HAS_POLARS:
+            # Polars parses the exports in its Rust engine and writes Parquet directly
+            combined = pl.concat([pl.read_json(streaming_pre + "/" + p).select(NEEDED_COLS)
+                                  for p, _ in files])\
+                         .with_columns(pl.col("ts").str.to_datetime("%Y-%m-%dT%H:%M:%SZ", time_zone="UTC"))\
+                         .with_columns(pl.col("ts").dt.truncate("1d").alias("stream_date"))
+            combined.write_parquet(parquet_cache, compression="zstd")
+        else:
+            frames = []
+            for p, _ in files:
+                with open(streaming_pre + "/" + p, "rb") as f:
+                    records = orjson.loads(f.read())
+                df_temp = pd.DataFrame.from_records(records, columns=NEEDED_COLS)
+                ts = pd.to_datetime(df_temp["ts"], format="%Y-%m-%dT%H:%M:%SZ", utc=True, cache=True)
+                df_temp["ts"] = ts
+                df_temp["stream_date"] = ts.dt.floor("D")
+                frames.append(df_temp)
+            streaming_data = pd.concat(frames, ignore_index=True, copy=False) if frames else pd.DataFrame()
+            streaming_data.to_parquet(parquet_cache, compression="zstd")
+    return os.path.getmtime(parquet_cache)
+
+def load_streaming_files(cache_mtime, min_date=None, max_date=None):
+    """Load combined streaming history from the Parquet cache"""
+    streaming_data = pd.read_parquet(parquet_cache, columns=NEEDED_COLS + ['stream_date'])
+
+    mask = ~streaming_data["master_metadata_track_name"].isna()
+    if min_date is not None:
+        mask &= streaming_data["stream_date"] >= pd.Timestamp(min_date, tz="UTC")
+    if max_date is not None:
+        mask &= streaming_data["stream_date"] <= pd.Timestamp(max_date, tz="UTC")
+    streaming_data = streaming_data[mask]
+    return streaming_data
+
+def clean_streaming_data(streaming_data):
+    """Derive analysis columns; the non-PI projection already happened at load time"""
+    streaming_data["ms_played"] = streaming_data["ms_played"].astype("int32")
+    streaming_data["minutes"] = streaming_data["ms_played"].astype("float32") / np.float32(60000.0)
+    # Timeline columns computed once here instead of on every rerun in tab4
+    streaming_data["hour"] = streaming_data["ts"].dt.hour.astype("int8")
+    streaming_data["dow"] = streaming_data["ts"].dt.dayofweek.astype("int8")
+    # Categorical codes make every downstream groupby hash small ints instead of strings
+    for c in ('platform', 'master_metadata_track_name', 'master_metadata_album_artist_name',
+              'master_metadata_album_album_name', 'reason_start', 'reason_end', 'spotify_track_uri'):
+        streaming_data[c] = streaming_data[c].astype('category')
+    # Sorting by ts once lets the time-bucketed aggregations run hash-free
+    streaming_data = streaming_data.sort_values("ts", ignore_index=True)
+    return streaming_data
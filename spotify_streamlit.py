@@ -7,6 +7,9 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from collections import Counter
 
+import spotify_io
+from spotify_io import _ensure_parquet_cache, _find_streaming_files
+
 # Page config
 st.set_page_config(
     page_title="2025 Spotify Dashboard",
@@ -24,44 +27,255 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# Data loading functions
-streaming_pre = './streaming_history_files'
+# Data loading (shared helpers live in spotify_io; caching is applied here)
+load_streaming_files = st.cache_data(spotify_io.load_streaming_files)
+clean_streaming_data = st.cache_data(spotify_io.clean_streaming_data)
+
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+if _HAS_NUMBA:
+    @njit(cache=True)
+    def _song_agg_kernel(keys, ms):
+        """One linear pass over packed (track, artist) codes -> per-group count and ms sum"""
+        key_slot = {}
+        counts = np.zeros(keys.shape[0], dtype=np.int64)
+        sums = np.zeros(keys.shape[0], dtype=np.int64)
+        n = 0
+        for i in range(keys.shape[0]):
+            k = keys[i]
+            if k in key_slot:
+                slot = key_slot[k]
+            else:
+                slot = n
+                key_slot[k] = n
+                n += 1
+            counts[slot] += 1
+            sums[slot] += ms[i]
+        out_keys = np.empty(n, dtype=np.int64)
+        for k, slot in key_slot.items():
+            out_keys[slot] = k
+        return out_keys, counts[:n], sums[:n]
 
 @st.cache_data
-def load_streaming_files(paths, min_date=None, max_date=None):
-    """Load and combine streaming history files"""
-    streaming_data = pd.DataFrame()
-    for p in sorted(paths):
-        df_temp = pd.read_json(streaming_pre + "/" + p)
-        df_temp["stream_date"] = pd.to_datetime(df_temp["ts"]).dt.date
-        df_temp["ts"] = pd.to_datetime(df_temp["ts"])
-        streaming_data = pd.concat([streaming_data, df_temp])
-    
-    if min_date is not None:
-        streaming_data = streaming_data[(streaming_data["stream_date"] >= pd.to_datetime(min_date).date())]
-    if max_date is not None:
-        streaming_data = streaming_data[(streaming_data["stream_date"] <= pd.to_datetime(max_date).date())]
-    
-    streaming_data = streaming_data[~streaming_data["master_metadata_track_name"].isna()]
-    return streaming_data
+def get_per_song_stats(_streaming_data, data_key):
+    """Single aggregation pass giving per-song plays and minutes, shared by the metrics and tab3"""
+    streaming_data = _streaming_data
+    track = streaming_data["master_metadata_track_name"]
+    artist = streaming_data["master_metadata_album_artist_name"]
+    if _HAS_NUMBA and len(streaming_data) > 200_000:
+        # Pack both categorical codes into one int64 key and reduce in a jitted loop.
+        # The shift comes from the artist category count so oversized code spaces
+        # fail loudly instead of silently colliding packed keys.
+        artist_bits = max(int(len(artist.cat.categories)).bit_length(), 1)
+        assert artist_bits + int(len(track.cat.categories)).bit_length() < 63, \
+            "packed (track, artist) codes would overflow int64"
+        track_codes = track.cat.codes.to_numpy(np.int64)
+        artist_codes = artist.cat.codes.to_numpy(np.int64)
+        # NaN keys have code -1; drop them to mirror groupby's dropna semantics
+        valid = (track_codes >= 0) & (artist_codes >= 0)
+        keys = (track_codes[valid] << artist_bits) | artist_codes[valid]
+        ms = streaming_data["ms_played"].to_numpy(np.int64)[valid]
+        out_keys, counts, ms_sums = _song_agg_kernel(keys, ms)
+        index = pd.MultiIndex.from_arrays(
+            [pd.Categorical.from_codes(out_keys >> artist_bits, dtype=track.dtype),
+             pd.Categorical.from_codes(out_keys & ((1 << artist_bits) - 1), dtype=artist.dtype)],
+            names=["master_metadata_track_name", "master_metadata_album_artist_name"])
+        return pd.DataFrame({"plays": counts, "minutes": ms_sums / 60000.0}, index=index)
+    return streaming_data.groupby(["master_metadata_track_name", "master_metadata_album_artist_name"],
+                                  observed=True, sort=False)\
+                         .agg(plays=("ms_played", "size"), minutes=("minutes", "sum"))
+
+# Per-tab aggregations. The leading-underscore frame args are skipped by Streamlit's
+# hasher; data_key (the Parquet cache mtime) stands in as the cache key instead.
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+@st.cache_data
+def get_daily_stats(_df, data_key):
+    return _df.set_index("ts")["minutes"].resample("D").sum().reset_index()\
+              .rename(columns={"ts": "stream_date"})
+
+@st.cache_data
+def get_monthly_stats(_df, data_key):
+    monthly_stats = _df.set_index("ts").resample("MS")\
+                       .agg(minutes=("minutes", "sum"), plays=("spotify_track_uri", "count"))\
+                       .reset_index()
+    monthly_stats["Month"] = monthly_stats["ts"].dt.strftime("%Y-%m")
+    return monthly_stats[["Month", "minutes", "plays"]]
 
 @st.cache_data
-def clean_streaming_data(streaming_data):
-    """Keep necessary, non-PI columns"""
-    streaming_data = streaming_data[['platform', 'ms_played', 'master_metadata_track_name', 
-                                      'master_metadata_album_artist_name', 'master_metadata_album_album_name', 
-                                      'spotify_track_uri', 'reason_start', 'reason_end', 'skipped', 
-                                      'stream_date', 'ts']].copy()
-    streaming_data["seconds"] = streaming_data["ms_played"] / 1000
-    streaming_data["minutes"] = streaming_data["seconds"] / 60
-    return streaming_data
+def get_dow_stats(_df, data_key):
+    # Keys are 0-6, so a weighted bincount beats the groupby machinery
+    minutes = np.bincount(_df["dow"].to_numpy(),
+                          weights=_df["minutes"].to_numpy(dtype=np.float64), minlength=7)
+    return pd.DataFrame({"dow": np.arange(7, dtype=np.int8), "day_of_week": DAY_ORDER,
+                         "minutes": minutes})
+
+@st.cache_data
+def get_hourly_stats(_df, data_key):
+    minutes = np.bincount(_df["hour"].to_numpy(),
+                          weights=_df["minutes"].to_numpy(dtype=np.float64), minlength=24)
+    return pd.DataFrame({"hour": np.arange(24, dtype=np.int8), "minutes": minutes})
+
+@st.cache_data
+def get_top_artists(_df, data_key, k=15):
+    top_plays = _df.groupby("master_metadata_album_artist_name", observed=True, sort=False)["master_metadata_track_name"]\
+                   .count().reset_index(name="plays").nlargest(k, "plays")
+    top_minutes = _df.groupby("master_metadata_album_artist_name", observed=True, sort=False)["minutes"]\
+                     .sum().reset_index(name="minutes").nlargest(k, "minutes")
+    return top_plays, top_minutes
+
+def _song_labels(top):
+    # Strings are rebuilt from the categorical codes only for the k displayed rows
+    return (top["master_metadata_track_name"].astype(str) + " - "
+            + top["master_metadata_album_artist_name"].astype(str)).values
+
+@st.cache_data
+def get_top_songs(_per_song, data_key, k=15):
+    top_plays = _per_song.reset_index().nlargest(k, "plays")
+    top_plays["song"] = _song_labels(top_plays)
+    top_minutes = _per_song.reset_index().nlargest(k, "minutes")
+    top_minutes["song"] = _song_labels(top_minutes)
+    return top_plays, top_minutes
+
+@st.cache_data
+def get_skip_counts(_df, data_key):
+    return _df["skipped"].value_counts()
+
+@st.cache_data
+def get_platform_counts(_df, data_key):
+    return _df["platform"].value_counts()
+
+@st.cache_data
+def get_platform_stats(_df, data_key):
+    platform_stats = _df.groupby("platform", observed=True, sort=False).agg({
+        "minutes": "sum",
+        "spotify_track_uri": "count"
+    }).reset_index()
+    platform_stats.columns = ["Platform", "minutes", "plays"]
+    return platform_stats
+
+# Figure builders. Rebuilding a go.Figure on every rerun is pure-Python dict
+# churn, so each one is cached on its (small) aggregated frame.
+@st.cache_resource
+def fig_daily_chart(streams_per_day):
+    fig = px.bar(streams_per_day, x="stream_date", y="minutes",
+                 title="Daily Listening Minutes",
+                 labels={"stream_date": "Date", "minutes": "Minutes"},
+                 color="minutes",
+                 color_continuous_scale="viridis")
+    fig.update_layout(showlegend=False, height=400)
+    return fig
+
+@st.cache_resource
+def fig_skip_chart(skip_stats):
+    fig = px.pie(values=skip_stats.values, names=['Completed', 'Skipped'],
+                 title="Completed vs Skipped Streams",
+                 color_discrete_map={0: '#1DB954', 1: '#191414'})
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource
+def fig_platform_pie(platform_counts):
+    fig = px.pie(values=platform_counts.values, names=platform_counts.index,
+                 title="Listening by Platform",
+                 color_discrete_sequence=px.colors.qualitative.Set2)
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource
+def fig_top_artists_plays(top_artists_plays):
+    fig = px.bar(top_artists_plays, x="plays", y="master_metadata_album_artist_name",
+                 orientation="h",
+                 labels={"master_metadata_album_artist_name": "Artist", "plays": "Number of Plays"},
+                 color="plays",
+                 color_continuous_scale="blues")
+    fig.update_layout(yaxis_categoryorder="total ascending", height=500)
+    return fig
+
+@st.cache_resource
+def fig_top_artists_minutes(top_artists_minutes):
+    fig = px.bar(top_artists_minutes, x="minutes", y="master_metadata_album_artist_name",
+                 orientation="h",
+                 labels={"master_metadata_album_artist_name": "Artist", "minutes": "Minutes"},
+                 color="minutes",
+                 color_continuous_scale="greens")
+    fig.update_layout(yaxis_categoryorder="total ascending", height=500)
+    return fig
+
+@st.cache_resource
+def fig_top_songs_plays(top_songs_plays):
+    fig = px.bar(top_songs_plays, x="plays", y="song",
+                 orientation="h",
+                 labels={"plays": "Number of Plays", "song": ""},
+                 color="plays",
+                 color_continuous_scale="purples")
+    fig.update_layout(yaxis_categoryorder="total ascending", height=500)
+    return fig
+
+@st.cache_resource
+def fig_top_songs_minutes(top_songs_minutes):
+    fig = px.bar(top_songs_minutes, x="minutes", y="song",
+                 orientation="h",
+                 labels={"minutes": "Minutes", "song": ""},
+                 color="minutes",
+                 color_continuous_scale="oranges")
+    fig.update_layout(yaxis_categoryorder="total ascending", height=500)
+    return fig
+
+@st.cache_resource
+def fig_monthly_chart(monthly_stats):
+    fig = px.line(monthly_stats, x="Month", y="minutes",
+                  title="Monthly Listening Minutes",
+                  markers=True,
+                  labels={"minutes": "Minutes", "Month": "Month"})
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource
+def fig_dow_chart(dow_stats):
+    fig = px.bar(dow_stats, x="day_of_week", y="minutes",
+                 title="Listening by Day of Week",
+                 labels={"day_of_week": "Day", "minutes": "Minutes"},
+                 color="minutes",
+                 color_continuous_scale="teal")
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource
+def fig_hourly_chart(hourly_stats):
+    fig = px.bar(hourly_stats, x="hour", y="minutes",
+                 title="Listening by Hour of Day",
+                 labels={"hour": "Hour of Day", "minutes": "Minutes"},
+                 color="minutes",
+                 color_continuous_scale="sunset")
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource
+def fig_platform_minutes(platform_stats):
+    return px.bar(platform_stats, x="Platform", y="minutes",
+                  title="Total Minutes by Platform",
+                  labels={"minutes": "Minutes"},
+                  color="minutes",
+                  color_continuous_scale="viridis")
+
+@st.cache_resource
+def fig_platform_plays_chart(platform_stats):
+    return px.bar(platform_stats, x="Platform", y="plays",
+                  title="Total Streams by Platform",
+                  labels={"plays": "Number of Plays"},
+                  color="plays",
+                  color_continuous_scale="plasma")
 
 # Load data
-streaming_paths = os.listdir(streaming_pre)
-audio_paths = [x for x in streaming_paths if "Audio" in x]
-audio_2025_paths = [x for x in audio_paths if "2025" in x]
+audio_2025_files = _find_streaming_files("*Audio*2025*")
 
-audio_2025_df = load_streaming_files(audio_2025_paths, "2025-01-01", "2025-12-31")
+data_key = _ensure_parquet_cache(audio_2025_files)
+audio_2025_df = load_streaming_files(data_key, "2025-01-01", "2025-12-31")
 audio_2025_df = clean_streaming_data(audio_2025_df)
 
 # Dashboard title
@@ -71,10 +285,11 @@ st.markdown("Your personalized Spotify listening analytics for 2025")
 # Key Metrics
 col1, col2, col3, col4 = st.columns(4)
 
-total_minutes = audio_2025_df["minutes"].sum()
-total_songs = audio_2025_df["spotify_track_uri"].count()
-unique_songs = audio_2025_df.groupby(["master_metadata_track_name", "master_metadata_album_artist_name"]).ngroups
-unique_artists = audio_2025_df["master_metadata_album_artist_name"].nunique()
+per_song_stats = get_per_song_stats(audio_2025_df, data_key)
+total_minutes = per_song_stats["minutes"].sum()
+total_songs = per_song_stats["plays"].sum()
+unique_songs = len(per_song_stats)
+unique_artists = per_song_stats.index.get_level_values("master_metadata_album_artist_name").nunique()
 
 col1.metric("Total Minutes Played", f"{total_minutes:,.0f}")
 col2.metric("Total Streams", f"{total_songs:,}")
@@ -91,170 +306,78 @@ with tab1:
     
     with col1:
         # Hours per day average
-        streams_per_day = audio_2025_df.groupby("stream_date")["minutes"].sum().reset_index()
+        streams_per_day = get_daily_stats(audio_2025_df, data_key)
         avg_minutes_per_day = streams_per_day["minutes"].mean()
         st.metric("Average Minutes/Day", f"{avg_minutes_per_day:.1f}")
         
         # Listening hours per day chart
-        fig_daily = px.bar(streams_per_day, x="stream_date", y="minutes",
-                           title="Daily Listening Minutes",
-                           labels={"stream_date": "Date", "minutes": "Minutes"},
-                           color="minutes",
-                           color_continuous_scale="viridis")
-        fig_daily.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig_daily, use_container_width=True)
+        st.plotly_chart(fig_daily_chart(streams_per_day), use_container_width=True)
     
     with col2:
         # Skipped vs completed
-        skip_stats = audio_2025_df["skipped"].value_counts()
-        fig_skip = px.pie(values=skip_stats.values, names=['Completed', 'Skipped'],
-                         title="Completed vs Skipped Streams",
-                         color_discrete_map={0: '#1DB954', 1: '#191414'})
-        fig_skip.update_layout(height=400)
-        st.plotly_chart(fig_skip, use_container_width=True)
+        skip_stats = get_skip_counts(audio_2025_df, data_key)
+        st.plotly_chart(fig_skip_chart(skip_stats), use_container_width=True)
     
     # Platform distribution
-    platform_counts = audio_2025_df["platform"].value_counts()
-    fig_platform = px.pie(values=platform_counts.values, names=platform_counts.index,
-                         title="Listening by Platform",
-                         color_discrete_sequence=px.colors.qualitative.Set2)
-    fig_platform.update_layout(height=400)
-    st.plotly_chart(fig_platform, use_container_width=True)
+    platform_counts = get_platform_counts(audio_2025_df, data_key)
+    st.plotly_chart(fig_platform_pie(platform_counts), use_container_width=True)
 
 with tab2:
     col1, col2 = st.columns(2)
+    top_artists_plays, top_artists_minutes = get_top_artists(audio_2025_df, data_key)
     
     with col1:
         st.subheader("Top Artists by Plays")
-        top_artists_plays = audio_2025_df.groupby("master_metadata_album_artist_name")["master_metadata_track_name"]\
-                            .count().reset_index(name="plays").sort_values("plays", ascending=False).head(15)
-        
-        fig_artists_plays = px.bar(top_artists_plays, x="plays", y="master_metadata_album_artist_name",
-                                   orientation="h",
-                                   labels={"master_metadata_album_artist_name": "Artist", "plays": "Number of Plays"},
-                                   color="plays",
-                                   color_continuous_scale="blues")
-        fig_artists_plays.update_layout(yaxis_categoryorder="total ascending", height=500)
-        st.plotly_chart(fig_artists_plays, use_container_width=True)
+        st.plotly_chart(fig_top_artists_plays(top_artists_plays), use_container_width=True)
     
     with col2:
         st.subheader("Top Artists by Minutes Played")
-        top_artists_minutes = audio_2025_df.groupby("master_metadata_album_artist_name")["minutes"]\
-                              .sum().reset_index(name="minutes").sort_values("minutes", ascending=False).head(15)
-        
-        fig_artists_minutes = px.bar(top_artists_minutes, x="minutes", y="master_metadata_album_artist_name",
-                                     orientation="h",
-                                     labels={"master_metadata_album_artist_name": "Artist", "minutes": "Minutes"},
-                                     color="minutes",
-                                     color_continuous_scale="greens")
-        fig_artists_minutes.update_layout(yaxis_categoryorder="total ascending", height=500)
-        st.plotly_chart(fig_artists_minutes, use_container_width=True)
+        st.plotly_chart(fig_top_artists_minutes(top_artists_minutes), use_container_width=True)
 
 with tab3:
     col1, col2 = st.columns(2)
+    top_songs_plays, top_songs_minutes = get_top_songs(per_song_stats, data_key)
     
     with col1:
         st.subheader("Top Songs by Plays")
-        top_songs_plays = audio_2025_df.groupby(["master_metadata_track_name", "master_metadata_album_artist_name"])\
-                          ["master_metadata_track_name"].count().reset_index(name="plays")\
-                          .sort_values("plays", ascending=False).head(15)
-        top_songs_plays["song"] = top_songs_plays["master_metadata_track_name"] + " - " + top_songs_plays["master_metadata_album_artist_name"]
-        
-        fig_songs_plays = px.bar(top_songs_plays, x="plays", y="song",
-                                orientation="h",
-                                labels={"plays": "Number of Plays", "song": ""},
-                                color="plays",
-                                color_continuous_scale="purples")
-        fig_songs_plays.update_layout(yaxis_categoryorder="total ascending", height=500)
-        st.plotly_chart(fig_songs_plays, use_container_width=True)
+        st.plotly_chart(fig_top_songs_plays(top_songs_plays), use_container_width=True)
     
     with col2:
         st.subheader("Top Songs by Minutes Played")
-        top_songs_minutes = audio_2025_df.groupby(["master_metadata_track_name", "master_metadata_album_artist_name"])\
-                            ["minutes"].sum().reset_index(name="minutes")\
-                            .sort_values("minutes", ascending=False).head(15)
-        top_songs_minutes["song"] = top_songs_minutes["master_metadata_track_name"] + " - " + top_songs_minutes["master_metadata_album_artist_name"]
-        
-        fig_songs_minutes = px.bar(top_songs_minutes, x="minutes", y="song",
-                                  orientation="h",
-                                  labels={"minutes": "Minutes", "song": ""},
-                                  color="minutes",
-                                  color_continuous_scale="oranges")
-        fig_songs_minutes.update_layout(yaxis_categoryorder="total ascending", height=500)
-        st.plotly_chart(fig_songs_minutes, use_container_width=True)
+        st.plotly_chart(fig_top_songs_minutes(top_songs_minutes), use_container_width=True)
 
 with tab4:
     col1, col2 = st.columns(2)
     
     with col1:
         # Monthly trends
-        audio_2025_df["year_month"] = pd.to_datetime(audio_2025_df["stream_date"]).dt.to_period("M")
-        monthly_stats = audio_2025_df.groupby("year_month").agg({
-            "minutes": "sum",
-            "spotify_track_uri": "count"
-        }).reset_index()
-        monthly_stats.columns = ["Month", "minutes", "plays"]
-        monthly_stats["Month"] = monthly_stats["Month"].astype(str)
+        monthly_stats = get_monthly_stats(audio_2025_df, data_key)
         
-        fig_monthly = px.line(monthly_stats, x="Month", y="minutes",
-                             title="Monthly Listening Minutes",
-                             markers=True,
-                             labels={"minutes": "Minutes", "Month": "Month"})
-        fig_monthly.update_layout(height=400)
-        st.plotly_chart(fig_monthly, use_container_width=True)
+        st.plotly_chart(fig_monthly_chart(monthly_stats), use_container_width=True)
     
     with col2:
         # Day of week analysis
-        audio_2025_df["day_of_week"] = pd.to_datetime(audio_2025_df["stream_date"]).dt.day_name()
-        day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        dow_stats = audio_2025_df.groupby("day_of_week")["minutes"].sum().reindex(day_order).reset_index()
+        dow_stats = get_dow_stats(audio_2025_df, data_key)
         
-        fig_dow = px.bar(dow_stats, x="day_of_week", y="minutes",
-                        title="Listening by Day of Week",
-                        labels={"day_of_week": "Day", "minutes": "Minutes"},
-                        color="minutes",
-                        color_continuous_scale="teal")
-        fig_dow.update_layout(height=400)
-        st.plotly_chart(fig_dow, use_container_width=True)
+        st.plotly_chart(fig_dow_chart(dow_stats), use_container_width=True)
     
     # Hour of day analysis
-    audio_2025_df["hour"] = pd.to_datetime(audio_2025_df["ts"]).dt.hour
-    hourly_stats = audio_2025_df.groupby("hour")["minutes"].sum().reset_index()
+    hourly_stats = get_hourly_stats(audio_2025_df, data_key)
     
-    fig_hourly = px.bar(hourly_stats, x="hour", y="minutes",
-                       title="Listening by Hour of Day",
-                       labels={"hour": "Hour of Day", "minutes": "Minutes"},
-                       color="minutes",
-                       color_continuous_scale="sunset")
-    fig_hourly.update_layout(height=400)
-    st.plotly_chart(fig_hourly, use_container_width=True)
+    st.plotly_chart(fig_hourly_chart(hourly_stats), use_container_width=True)
 
 with tab5:
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Platform Distribution")
-        platform_stats = audio_2025_df.groupby("platform").agg({
-            "minutes": "sum",
-            "spotify_track_uri": "count"
-        }).reset_index()
-        platform_stats.columns = ["Platform", "minutes", "plays"]
+        platform_stats = get_platform_stats(audio_2025_df, data_key)
         
-        fig_platform_detail = px.bar(platform_stats, x="Platform", y="minutes",
-                                    title="Total Minutes by Platform",
-                                    labels={"minutes": "Minutes"},
-                                    color="minutes",
-                                    color_continuous_scale="viridis")
-        st.plotly_chart(fig_platform_detail, use_container_width=True)
+        st.plotly_chart(fig_platform_minutes(platform_stats), use_container_width=True)
     
     with col2:
         st.subheader("Platform Plays")
-        fig_platform_plays = px.bar(platform_stats, x="Platform", y="plays",
-                                   title="Total Streams by Platform",
-                                   labels={"plays": "Number of Plays"},
-                                   color="plays",
-                                   color_continuous_scale="plasma")
-        st.plotly_chart(fig_platform_plays, use_container_width=True)
+        st.plotly_chart(fig_platform_plays_chart(platform_stats), use_container_width=True)
     
     # Platform details table
     st.dataframe(platform_stats.sort_values("minutes", ascending=False), use_container_width=True)
\ No newline at end of file